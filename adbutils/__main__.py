@@ -24,7 +24,7 @@ import requests
 
 import adbutils
 from adbutils import adb as adbclient
-from adbutils._utils import ReadProgress, current_ip, APKReader
+from adbutils._utils import HTTP_URL_RE, ReadProgress, current_ip, APKReader
 
 
 def _setup_minicap(d: adbutils.AdbDevice):
@@ -217,7 +217,7 @@ def main():
         uri = args.parse
         
         fp = None
-        if re.match(r"^https?://", uri):
+        if HTTP_URL_RE.match(uri):
             try:
                 import httpio
             except ImportError:
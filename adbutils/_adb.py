@@ -9,6 +9,7 @@ from __future__ import annotations
 import os
 import socket
 import subprocess
+import time
 import typing
 import weakref
 from typing import Iterator, List, Union
@@ -23,6 +24,7 @@ from adbutils._version import __version__
 
 _OKAY = b"OKAY"
 _FAIL = b"FAIL"
+_FORWARD_INDEX_TTL = 1.0
 
 
 def _check_server(host: str, port: int) -> bool:
@@ -168,6 +170,8 @@ class BaseClient(object):
         self.__host = host
         self.__port = port
         self.__socket_timeout = socket_timeout
+        self._device_features: typing.Dict[tuple, typing.Set[str]] = {}  # cache of device features
+        self._forward_index: typing.Optional[typing.Tuple[float, typing.Dict[tuple, int]]] = None
 
     @property
     def host(self) -> str:
@@ -192,6 +196,29 @@ class BaseClient(object):
         except TimeoutError:
             raise AdbTimeout("connect to adb server timeout")
 
+    def _get_device_features(self, serial: str = None, transport_id: int = None) -> typing.Set[str]:
+        """ features supported by both adb server and device, queried once per device
+
+        Return example:
+            {'shell_v2', 'cmd', 'stat_v2', 'sendrecv_v2', 'sendrecv_v2_lz4'}
+        """
+        key = (serial, transport_id)
+        features = self._device_features.get(key)
+        if features is None:
+            prefix = f"host-transport-id:{transport_id}" if transport_id else f"host-serial:{serial}"
+            try:
+                with self.make_connection() as c:
+                    c.send_command(prefix + ":features")
+                    c.check_okay()
+                    features = set(filter(None, c.read_string_block().split(",")))
+            except AdbError as e:
+                if "unknown host service" not in str(e):
+                    # device offline/unauthorized or timeout, ask again next time
+                    return set()
+                features = set()  # adb server too old, it will never answer
+            self._device_features[key] = features
+        return features
+
     def server_version(self):
         """ 40 will match 1.0.40
         Returns:
@@ -346,6 +373,20 @@ class BaseClient(object):
                 items.append(ForwardItem(*parts))
             return items
 
+    def _forwarded_tcp_port(self, serial: str, remote: str) -> typing.Optional[int]:
+        """ local tcp port already forwarded to (serial, remote)
+
+        forward list is cached for _FORWARD_INDEX_TTL seconds, and dropped by forward()
+        """
+        now = time.monotonic()
+        if self._forward_index is None or now - self._forward_index[0] >= _FORWARD_INDEX_TTL:
+            index = {}
+            for item in self.forward_list():
+                if item.local.startswith("tcp:"):
+                    index.setdefault((item.serial, item.remote), int(item.local[len("tcp:"):]))
+            self._forward_index = (now, index)
+        return self._forward_index[1].get((serial, remote))
+
     def forward(self, serial, local, remote, norebind=False):
         """
         Args:
@@ -361,6 +402,7 @@ class BaseClient(object):
             if norebind:
                 cmds.append("norebind")
             cmds.append(local + ";" + remote)
+            self._forward_index = None
             c.send_command(":".join(cmds))
             c.check_okay()
 
@@ -24,14 +24,22 @@ from adbutils.screenshot import ScreenshotExtesion
 from adbutils._adb import AdbConnection, BaseClient
 from adbutils._proto import *
 from adbutils._proto import StrOrPathLike
-from adbutils._utils import StopEvent, adb_path, get_free_port, list2cmdline
+from adbutils._utils import _DEFAULT_SOCKET_TIMEOUT, StopEvent, adb_path, get_free_port, list2cmdline
 from adbutils._version import __version__
 from adbutils.errors import AdbError
 from adbutils.shell import ShellExtension
 from adbutils.sync import Sync
 
 
-_DEFAULT_SOCKET_TIMEOUT = 600  # 10 minutes
+# shell protocol v2 packet ids
+_SHELL_V2_STDOUT = 1
+_SHELL_V2_STDERR = 2
+_SHELL_V2_EXIT = 3
+
+# getprop output line, eg: [ro.product.model]: [Pixel 5]
+_GETPROP_RE = re.compile(r"^\[(?P<key>[^\]]+)\]: \[(?P<value>.*)\]\r?$", re.M)
+# runtime properties which change while device running, never prefilled into cache
+_READONLY_PROP_PREFIX = "ro."  # android never changes ro.* once set
 
 
 class BaseDevice:
@@ -50,6 +58,7 @@ class BaseDevice:
         self._serial = serial
         self._transport_id: int = transport_id
         self._properties = {}  # store properties data
+        self._properties_loaded = False  # whether _properties filled by a full getprop
 
         if not serial and not transport_id:
             raise AdbError("serial, transport_id must set atleast one")
@@ -115,6 +124,14 @@ class BaseDevice:
         """
         return self._get_with_command("features")
 
+    def supports(self, feature: str) -> bool:
+        """
+        Check if both adb server and device support the feature, eg: shell_v2, sendrecv_v2
+
+        Features are queried once, and cached in client for the device
+        """
+        return feature in self._client._get_device_features(self._serial, self._transport_id)
+
     @property
     def info(self) -> dict:
         return {
@@ -143,7 +160,9 @@ class BaseDevice:
         Raises:
             EnvironmentError
         """
-        cmds = [adb_path(), "-s", self._serial] if self._serial else [adb_path()]
+        cmds = [adb_path()]
+        if self._serial:
+            cmds.extend(["-s", self._serial])
         cmds.extend(args)
         try:
             return subprocess.check_output(
@@ -198,6 +217,34 @@ class BaseDevice:
             return output.rstrip() if rstrip else output
         return output
 
+    def exec_out(
+        self,
+        cmdargs: Union[str, list, tuple],
+        timeout: Optional[float] = _DEFAULT_SOCKET_TIMEOUT,
+        encoding: str | None = None,
+    ) -> Union[str, bytes]:
+        """Same as adb exec-out, output is binary clean (no pty, no CRLF conversion)
+
+        Args:
+            timeout (float): set command timeout
+            encoding (str): set output encoding (Default: None), None means return bytes
+
+        Returns:
+            bytes (or string when encoding is set) of output
+
+        Raises:
+            AdbTimeout
+
+        Examples:
+            exec_out(["screencap", "-p"])
+        """
+        if isinstance(cmdargs, (list, tuple)):
+            cmdargs = list2cmdline(cmdargs)
+        c = self.open_transport(timeout=timeout)
+        c.send_command("exec:" + cmdargs)
+        c.check_okay()
+        return c.read_until_close(encoding=encoding)
+
     def shell2(
         self,
         cmdargs: Union[str, list, tuple],
@@ -222,6 +269,15 @@ class BaseDevice:
         if isinstance(cmdargs, (list, tuple)):
             cmdargs = list2cmdline(cmdargs)
         assert isinstance(cmdargs, str)
+        if self.supports("shell_v2"):
+            returncode, output = self._shell_v2(cmdargs, timeout=timeout)
+            if encoding:
+                output = output.decode(encoding, errors="replace")
+                if rstrip:
+                    output = output.rstrip()
+            return ShellReturn(command=cmdargs, returncode=returncode, output=output)
+
+        # old device: append exit code to the output
         MAGIC = "X4EXIT:"
         newcmd = cmdargs + f"; echo {MAGIC}$?"
         output = self.shell(newcmd, timeout=timeout, encoding=encoding, rstrip=True)
@@ -234,6 +290,32 @@ class BaseDevice:
             output = output.rstrip()
         return ShellReturn(command=cmdargs, returncode=returncoode, output=output)
 
+    def _shell_v2(self, cmdargs: str, timeout: Optional[float] = _DEFAULT_SOCKET_TIMEOUT) -> typing.Tuple[int, bytes]:
+        """Run command with shell protocol v2, stdout and stderr are merged in arrival order
+
+        Returns:
+            (returncode, output)
+
+        Raises:
+            AdbError, AdbTimeout
+        """
+        # Ref: https://android.googlesource.com/platform/packages/modules/adb/+/refs/heads/main/shell_protocol.h
+        # packet: {id:1 byte}{LittleEndianLength:4 bytes}{payload}
+        with self.open_transport(timeout=timeout) as c:
+            c.send_command("shell,v2,raw:" + cmdargs)
+            c.check_okay()
+            output = bytearray()
+            while True:
+                header = c.read(5)
+                if len(header) != 5:
+                    raise AdbError("shell v2 exit code missing", cmdargs)
+                packet_id, size = header[0], int.from_bytes(header[1:], "little")
+                payload = c.read(size)
+                if packet_id in (_SHELL_V2_STDOUT, _SHELL_V2_STDERR):
+                    output += payload
+                elif packet_id == _SHELL_V2_EXIT:
+                    return payload[0], bytes(output)
+
     def forward(self, local: str, remote: str, norebind: bool = False):
         self._client.forward(self._serial, local, remote, norebind)
 
@@ -241,13 +323,9 @@ class BaseDevice:
         """forward remote port to local random port"""
         if isinstance(remote, int):
             remote = "tcp:" + str(remote)
-        for f in self.forward_list():
-            if (
-                f.serial == self._serial
-                and f.remote == remote
-                and f.local.startswith("tcp:")
-            ):  # yapf: disable
-                return int(f.local[len("tcp:") :])
+        local_port = self._client._forwarded_tcp_port(self._serial, remote)
+        if local_port is not None:
+            return local_port
         local_port = get_free_port()
         self.forward("tcp:" + str(local_port), remote)
         return local_port
@@ -474,11 +552,34 @@ class Property:
         return f"product:{self.name} model:{self.model} device:{self.device}"
 
     def get(self, name: str, cache=True) -> str:
-        if cache and name in self._d._properties:
-            return self._d._properties[name]
+        """
+        Args:
+            name (str): property name
+            cache (bool): use cache data first (Default: True)
+
+        Note:
+            The first cached get of a read-only property (ro.*) loads all of them with one
+            getprop call, later cached gets return that snapshot. Other properties can change
+            at runtime, they are fetched on first use and cached per name as before.
+            Pass cache=False to always read the current value.
+        """
+        if cache:
+            if name.startswith(_READONLY_PROP_PREFIX) and not self._d._properties_loaded:
+                self._load_all()
+            if name in self._d._properties:
+                return self._d._properties[name]
         value = self._d._properties[name] = self._d.shell(["getprop", name]).strip()
         return value
 
+    def _load_all(self):
+        """fill cache with the read-only properties of a single getprop call"""
+        output = self._d.shell(["getprop"])
+        for m in _GETPROP_RE.finditer(output):
+            key = m.group("key")
+            if key.startswith(_READONLY_PROP_PREFIX):
+                self._d._properties.setdefault(key, m.group("value").strip())
+        self._d._properties_loaded = True
+
     @property
     def name(self):
         return self.get("ro.product.name", cache=True)
@@ -506,4 +607,5 @@ class AdbDevice(
         self, client: BaseClient, serial: str = None, transport_id: int = None
     ):
         BaseDevice.__init__(self, client, serial, transport_id)
+        ShellExtension.__init__(self)
         ScreenrecordExtension.__init__(self)
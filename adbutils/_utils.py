@@ -1,7 +1,9 @@
+import functools
 import hashlib
 import importlib.resources
 import os
 import random
+import re
 import shlex
 import socket
 import subprocess
@@ -23,6 +25,9 @@ from adbutils.errors import AdbError
 
 MB = 1024 * 1024
 
+HTTP_URL_RE = re.compile(r"^https?://")
+_DEFAULT_SOCKET_TIMEOUT = 600  # 10 minutes
+
 
 def append_path(base: typing.Union[str, pathlib.Path], addition: str) -> str:
     if isinstance(base, pathlib.Path):
@@ -93,7 +98,12 @@ def adb_path():
     # 0. check env: ADBUTILS_ADB_PATH
     if os.getenv("ADBUTILS_ADB_PATH"):
         return os.getenv("ADBUTILS_ADB_PATH")
-        
+    return _find_adb_path()
+
+
+@functools.lru_cache(maxsize=1)
+def _find_adb_path():
+    """ validating exe runs "adb version", so only search once """
     # 1. find in $PATH
     exe = which("adb")
     if exe and _is_valid_exe(exe):
@@ -256,6 +266,43 @@ class StopEvent:
         self.__done.clear()
 
 
+_SEND_KEYS_TABLE = str.maketrans({
+    "-": r"\-",
+    "+": r"\+",
+    "[": r"\[",
+    "]": r"\]",
+    "(": r"\(",
+    ")": r"\)",
+    "{": r"\{",
+    "}": r"\}",
+    "\\": r"\\\\",
+    "^": r"\^",
+    "$": r"\$",
+    "*": r"\*",
+    ".": r"\.",
+    ",": r"\,",
+    ":": r"\:",
+    "~": r"\~",
+    ";": r"\;",
+    ">": r"\>",
+    "<": r"\<",
+    "%": r"\%",
+    "#": r"\#",
+    "\'": r"\\'",
+    "\"": r'\\"',
+    "`": r"\`",
+    "!": r"\!",
+    "?": r"\?",
+    "|": r"\|",
+    "=": r"\=",
+    "@": r"\@",
+    "/": r"\/",
+    "_": r"\_",
+    " ": r"%s",  # special
+    "&": r"\&"
+})
+
+
 def escape_special_characters(text: str) -> str:
     """
     A helper that escape special characters
@@ -263,40 +310,4 @@ def escape_special_characters(text: str) -> str:
     Args:
         text: str
     """
-    escaped = text.translate(
-        str.maketrans({
-            "-": r"\-",
-            "+": r"\+",
-            "[": r"\[",
-            "]": r"\]",
-            "(": r"\(",
-            ")": r"\)",
-            "{": r"\{",
-            "}": r"\}",
-            "\\": r"\\\\",
-            "^": r"\^",
-            "$": r"\$",
-            "*": r"\*",
-            ".": r"\.",
-            ",": r"\,",
-            ":": r"\:",
-            "~": r"\~",
-            ";": r"\;",
-            ">": r"\>",
-            "<": r"\<",
-            "%": r"\%",
-            "#": r"\#",
-            "\'": r"\\'",
-            "\"": r'\\"',
-            "`": r"\`",
-            "!": r"\!",
-            "?": r"\?",
-            "|": r"\|",
-            "=": r"\=",
-            "@": r"\@",
-            "/": r"\/",
-            "_": r"\_",
-            " ": r"%s",  # special
-            "&": r"\&"
-        }))
-    return escaped
+    return text.translate(_SEND_KEYS_TABLE)
@@ -6,7 +6,7 @@
 
 import abc
 import os
-import re
+from concurrent.futures import ThreadPoolExecutor
 import time
 import typing
 
@@ -15,7 +15,11 @@ import apkutils2
 from retry import retry
 from adbutils.errors import AdbInstallError
 from adbutils.sync import Sync
-from adbutils._utils import humanize, ReadProgress
+from adbutils._utils import HTTP_URL_RE, humanize, ReadProgress
+
+
+def _parse_manifest(apk_path: str):
+    return apkutils2.APK(apk_path).manifest
 
 
 class AbstractDevice(abc.ABC):
@@ -64,7 +68,8 @@ class InstallExtension(AbstractDevice):
         Raises:
             AdbInstallError, BrokenPipeError
         """
-        if re.match(r"^https?://", path_or_url):
+        local_apk = not HTTP_URL_RE.match(path_or_url)
+        if not local_apk:
             resp = requests.get(path_or_url, stream=True)
             resp.raise_for_status()
             length = int(resp.headers.get("Content-Length", 0))
@@ -79,23 +84,32 @@ class InstallExtension(AbstractDevice):
             if not silent:
                 print(*args)
 
-        dst = "/data/local/tmp/tmp-%d.apk" % (int(time.time() * 1000))
+        dst = "/data/local/tmp/tmp-%d.apk" % (time.time_ns() // 1_000_000)
         _dprint("push to %s" % dst)
 
         start = time.time()
-        self.sync.push(r, dst)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            # local apk can be parsed while pushing, url apk is only complete after push
+            manifest_future = None
+            if local_apk:
+                manifest_future = executor.submit(_parse_manifest, path_or_url)
+            size = self.sync.push(r, dst)
+            if manifest_future:
+                manifest = manifest_future.result()
+            else:
+                manifest = _parse_manifest(r.filepath())
 
         # parse apk package-name
-        apk = apkutils2.APK(r.filepath())
-        package_name = apk.manifest.package_name
-        main_activity = apk.manifest.main_activity
+        package_name = manifest.package_name
+        main_activity = manifest.main_activity
         if main_activity and main_activity.find(".") == -1:
             main_activity = "." + main_activity
 
-        version_code = apk.manifest.version_code
+        version_code = manifest.version_code
+        version_name = manifest.version_name
         _dprint("packageName:", package_name)
         _dprint("mainActivity:", main_activity)
-        _dprint("apkVersion: {}".format(apk.manifest.version_name))
+        _dprint("apkVersion: {}".format(version_name))
         _dprint("Success pushed, time used %d seconds" % (time.time() - start))
 
         new_dst = "/data/local/tmp/{}-{}.apk".format(package_name,
@@ -104,10 +118,8 @@ class InstallExtension(AbstractDevice):
         self.shell(["mv", dst, new_dst])
 
         dst = new_dst
-        info = self.sync.stat(dst)
-        print("verify pushed apk, md5: %s, size: %s" %
-              (r._hash, humanize(info.size)))
-        assert info.size == r.copied
+        _dprint("pushed apk, md5: %s, size: %s" % (r._hash, humanize(size)))
+        assert size == r.copied
 
         if uninstall:
             _dprint("Uninstall app first")
@@ -257,8 +257,17 @@ def parse_start_proc(line):
     return None
 
 
-def tag_in_tags_regex(tag, tags):
-    return any(re.match(r'^' + t + r'$', tag) for t in map(str.strip, tags))
+def compile_tags_regex(tags):
+    return [re.compile(r'^' + t + r'$') for t in map(str.strip, tags or [])]
+
+
+def tag_in_tags_regex(tag, tags_regex):
+    return any(r.match(tag) for r in tags_regex)
+
+
+# tag filters come from the command line, compile them once instead of per log line
+tags_regex = compile_tags_regex(args.tag)
+ignored_tags_regex = compile_tags_regex(args.ignored_tag)
 
 
 ps_pid = adb_device.shell("ps || ps -A")
@@ -326,9 +335,9 @@ for line in adb_stdout:
         continue
     if level in LOG_LEVELS_MAP and LOG_LEVELS_MAP[level] < min_level:
         continue
-    if args.ignored_tag and tag_in_tags_regex(tag, args.ignored_tag):
+    if ignored_tags_regex and tag_in_tags_regex(tag, ignored_tags_regex):
         continue
-    if args.tag and not tag_in_tags_regex(tag, args.tag):
+    if tags_regex and not tag_in_tags_regex(tag, tags_regex):
         continue
 
     linebuf = ''
@@ -14,19 +14,30 @@ import subprocess
 import textwrap
 import threading
 import time
+from contextlib import contextmanager
 from typing import Union
 import typing
 import weakref
 
 from retry import retry
 
-from adbutils.errors import AdbError
+from adbutils.errors import AdbError, AdbTimeout
 from adbutils._utils import adb_path
 from adbutils._adb import AdbConnection, Network
 from adbutils._proto import ShellReturn
 from adbutils.sync import Sync
 
 
+def _drain(s: socket.socket):
+    """ read s until closed, output is discarded into one reused buffer """
+    buf = memoryview(bytearray(64 * 1024))
+    try:
+        while s.recv_into(buf):
+            pass
+    except socket.timeout:
+        raise AdbTimeout("adb read timeout")
+
+
 class AbstractDevice(abc.ABC):
     @property
     @abc.abstractmethod
@@ -101,6 +112,20 @@ class ScreenrecordExtension(AbstractDevice):
         """is recording"""
         return self.__get_screenrecord_impl().is_recording()
 
+    @contextmanager
+    def screenrecord(self, filename: str):
+        """record video while running the with block, stopped even if the block raises
+
+        Example:
+            with d.screenrecord("video.mp4"):
+                d.click(100, 100)
+        """
+        self.start_recording(filename)
+        try:
+            yield
+        finally:
+            self.stop_recording()
+
     def __get_screenrecord_impl(self) -> AbstractScreenrecord:
         if self._record_client:
             return self._record_client
@@ -266,7 +291,7 @@ class _AdbScreenRecord(AbstractScreenrecord):
         """The maxium record time is 3 minutes"""
         self._d = d
         if not remote_path:
-            remote_path = "/sdcard/adbutils-tmp-video-%d.mp4" % int(time.time() * 1000)
+            remote_path = "/sdcard/adbutils-tmp-video-%d.mp4" % (time.time_ns() // 1_000_000)
         self._remote_path = remote_path
         self._stream = None
 
@@ -279,9 +304,9 @@ class _AdbScreenRecord(AbstractScreenrecord):
 
     def _start(self, filename: str):
         self._filename = filename
-        script_content = textwrap.dedent(
+        # the script is passed with sh -c, so nothing has to be pushed before recording
+        script = textwrap.dedent(
             """\
-        #!/system/bin/sh
         # generate by adbutils
         screenrecord "$1" &
         PID=$!
@@ -289,16 +314,18 @@ class _AdbScreenRecord(AbstractScreenrecord):
         kill -INT $PID
         wait
         """
-        ).encode("utf-8")
-        self._d.sync.push(script_content, "/sdcard/adbutils-screenrecord.sh")
+        )
         self._stream: AdbConnection = self._d.shell(
-            ["sh", "/sdcard/adbutils-screenrecord.sh", self._remote_path], stream=True
+            ["sh", "-c", script, "adbutils-screenrecord", self._remote_path], stream=True
         )
 
     def _stop(self):
         self._stream.send(b"\n")
-        self._stream.read_until_close()
+        # the script exits after screenrecord finished writing the mp4,
+        # so the pull can not start before the drain is done
+        _drain(self._stream.conn)
         self._stream.close()
 
-        self._d.sync.pull(self._remote_path, self._filename)
+        with self._d.sync.session() as sync:  # stat and recv share one connection
+            sync.pull(self._remote_path, self._filename)
         self._d.remove(self._remote_path)
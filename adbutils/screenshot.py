@@ -22,6 +22,8 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+_DISPLAY_ID_RE = re.compile(r"Display (\d+) ")
+
 class AbstractDevice(abc.ABC):
     @property
     @abc.abstractmethod
@@ -32,6 +34,10 @@ class AbstractDevice(abc.ABC):
     def shell(self, cmd: str, encoding: Optional[str]) -> Union[str, bytes]:
         pass
 
+    @abc.abstractmethod
+    def exec_out(self, cmd: str, encoding: Optional[str] = None) -> Union[str, bytes]:
+        pass
+
     @abc.abstractmethod
     def window_size(self) -> WindowSize:
         pass
@@ -74,15 +80,15 @@ class ScreenshotExtesion(AbstractDevice):
         if display_id is not None:
             _id = self.__get_real_display_id(display_id)
             cmdargs.extend(['-d', _id])
-        png_bytes = self.shell(cmdargs, encoding=None)
+        # exec: service stream the png directly, no tty CRLF mangling
+        png_bytes = self.exec_out(cmdargs)
         return Image.open(io.BytesIO(png_bytes))
 
     def __get_real_display_id(self, display_id: int) -> str:
         # adb shell dumpsys SurfaceFlinger --display-id
         # Display 4619827259835644672 (HWC display 0): port=0 pnpId=GGL displayName="EMU_display_0"
         output = self.shell("dumpsys SurfaceFlinger --display-id")
-        _RE = re.compile(r"Display (\d+) ")
-        ids = _RE.findall(output)
+        ids = _DISPLAY_ID_RE.findall(output)
         if not ids:
             raise AdbError("No display found, debug with 'dumpsys SurfaceFlinger --display-id'")
         if display_id >= len(ids):
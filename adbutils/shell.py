@@ -6,14 +6,16 @@
 
 import abc
 import datetime
+import io
 import json
 import logging
 import re
+import socket
 import time
-from typing import List, Optional, Union
+from typing import Iterator, List, Optional, Tuple, Union
 from adbutils._proto import WindowSize, AppInfo, RunningAppInfo, BatteryInfo, BrightnessMode
-from adbutils.errors import AdbError, AdbInstallError
-from adbutils._utils import escape_special_characters
+from adbutils.errors import AdbError, AdbInstallError, AdbTimeout
+from adbutils._utils import _DEFAULT_SOCKET_TIMEOUT, HTTP_URL_RE, escape_special_characters, list2cmdline
 from retry import retry
 
 from adbutils.sync import Sync
@@ -24,6 +26,35 @@ _DISPLAY_RE = re.compile(
     r".*DisplayViewport{.*?valid=true, .*?orientation=(?P<orientation>\d+), .*?deviceWidth=(?P<width>\d+), deviceHeight=(?P<height>\d+).*"
 )
 
+_WM_SIZE_RE = re.compile(r"(?P<kind>Override|Physical) size: (?P<width>\d+)x(?P<height>\d+)")
+_ORIENTATION_RE = re.compile(r".*?orientation=(?P<orientation>\d+)")
+_INET_ADDR_RE = re.compile(r"inet\s*addr:(.*?)\s", re.DOTALL)
+_INET_IP_RE = re.compile(r"inet (\d+.*?)/\d+")
+_PACKAGE_LINE_RE = re.compile(rb"^package:([^\s]+)\r?$", re.M)
+
+# fields of "dumpsys package", one named group per alternative, scanned in a single pass
+_TIME_REGEX = r"[-\d]+\s+[:\d]+"
+_PACKAGE_INFO_RE = re.compile("|".join([
+    r"versionName=(?P<version_name>[^\s]+)",
+    r"versionCode=(?P<version_code>\d+)",
+    r"PackageSignatures\{.*?\[(?P<signature>.*)\]\}",
+    r"pkgFlags=\[\s*(?P<pkgflags>.*)\s*\]",
+    f"firstInstallTime=(?P<first_install_time>{_TIME_REGEX})",
+    f"lastUpdateTime=(?P<last_update_time>{_TIME_REGEX})",
+]))
+_PACKAGE_INFO_FIELDS = len(_PACKAGE_INFO_RE.groupindex)
+
+# dumpsys output is ASCII, re.ASCII keeps \s and \w off the unicode tables
+# the rest of the line after "mCurrentFocus=" is matched with _FOCUSED_RE
+_FOCUSED_RE = re.compile(
+    r"Window\{[^}]*\s(?P<package>[^\s]+)/(?P<activity>[^\s]+)\}", re.ASCII
+)
+# mResumedActivity of "dumpsys activity activities" or ACTIVITY of "dumpsys activity top"
+_RESUMED_OR_ACTIVITY_RE = re.compile("|".join([
+    r"(?P<resumed>mResumedActivity: ActivityRecord\{[^{}]*?\s+(?P<resumed_package>[^\s]+)/[^\s]+\s[^{}]*?\})",
+    r"(?P<top>ACTIVITY (?P<package>[^\s]+)/(?P<activity>[^/\s]+) \w+ pid=(?P<pid>\d+))",
+]), re.ASCII)  # yapf: disable
+
 
 def is_percent(v):
     return isinstance(v, float) and v <= 1.0
@@ -41,6 +72,15 @@ class AbstractShellDevice(abc.ABC):
 
 
 class ShellExtension(AbstractShellDevice):
+    # seconds to reuse the last window_size() result, 0 means always query device
+    window_size_cache_ttl: float = 0.0
+    # seconds to reuse the last app_current() result, 0 means always query device
+    app_current_cache_ttl: float = 0.0
+
+    def __init__(self):
+        self._window_size_cache: Optional[Tuple[float, WindowSize]] = None  # (monotonic time, size)
+        self._app_current_cache: Optional[Tuple[float, RunningAppInfo]] = None  # (monotonic time, app)
+
     def getprop(self, prop: str) -> str:
         return self.shell(["getprop", prop]).strip()
 
@@ -74,6 +114,26 @@ class ShellExtension(AbstractShellDevice):
     def reboot(self):
         self.shell("reboot")
 
+    def _shell_lines(self, cmdargs: Union[str, list, tuple],
+                     timeout: Optional[float] = _DEFAULT_SOCKET_TIMEOUT) -> Iterator[str]:
+        """ yield output lines of a shell command while it is running
+
+        The connection is closed when the iterator is closed or garbage collected,
+        so breaking out of the loop stops reading the rest of the output.
+
+        Raises:
+            AdbTimeout: no output for timeout seconds
+        """
+        c = self.shell(cmdargs, stream=True)
+        try:
+            c.conn.settimeout(timeout)  # shell(stream=True) does not set one
+            with c.conn.makefile("rb") as f:
+                yield from io.TextIOWrapper(f, encoding="utf-8", errors="replace")
+        except socket.timeout:
+            raise AdbTimeout("adb read timeout")
+        finally:
+            c.close()
+
     def switch_screen(self, enable: bool):
         """turn screen on/off"""
         return self.keyevent(224 if enable else 223)
@@ -145,8 +205,8 @@ class ShellExtension(AbstractShellDevice):
             base_setting_cmd += ["0"]
             base_am_cmd += ["false"]
 
-        self.shell(base_setting_cmd)
-        self.shell(base_am_cmd)
+        # one shell round-trip for both commands
+        self.shell(list2cmdline(base_setting_cmd) + "; " + list2cmdline(base_am_cmd))
 
     def switch_wifi(self, enable: bool):
         """turn WiFi on/off"""
@@ -163,11 +223,25 @@ class ShellExtension(AbstractShellDevice):
         
         Raises:
             AdbError
+
+        Note:
+            set window_size_cache_ttl to reuse the result for a while,
+            call invalidate_window_size() after the screen rotated
         """
+        if self._window_size_cache and self.window_size_cache_ttl > 0:
+            cached_time, cached_size = self._window_size_cache
+            if time.monotonic() - cached_time < self.window_size_cache_ttl:
+                return cached_size
         wsize = self._wm_size()
         horizontal = self.rotation() % 2 == 1
-        logger.debug("get window size from 'wm size'", wsize, horizontal)
-        return WindowSize(wsize.height, wsize.width) if horizontal else wsize
+        logger.debug("get window size from 'wm size': %s, horizontal: %s", wsize, horizontal)
+        wsize = WindowSize(wsize.height, wsize.width) if horizontal else wsize
+        self._window_size_cache = (time.monotonic(), wsize)
+        return wsize
+
+    def invalidate_window_size(self):
+        """drop the cached window_size() result"""
+        self._window_size_cache = None
     
     # the ", deviceHeight=xxx}]" is not correct
     # def _dumpsys_window_size(self) -> WindowSize:
@@ -183,14 +257,13 @@ class ShellExtension(AbstractShellDevice):
     
     def _wm_size(self) -> WindowSize:
         output = self.shell("wm size")
-        o = re.search(r"Override size: (\d+)x(\d+)", output)
-        if o:
-            w, h = o.group(1), o.group(2)
-            return WindowSize(int(w), int(h))
-        m = re.search(r"Physical size: (\d+)x(\d+)", output)
-        if m:
-            w, h = m.group(1), m.group(2)
-            return WindowSize(int(w), int(h))
+        sizes = {}
+        for m in _WM_SIZE_RE.finditer(output):
+            sizes.setdefault(m.group("kind"), WindowSize(int(m.group("width")), int(m.group("height"))))
+        # Override size takes precedence over Physical size
+        wsize = sizes.get("Override") or sizes.get("Physical")
+        if wsize:
+            return wsize
         raise AdbError("wm size output unexpected", output)
 
     def swipe(self, sx, sy, ex, ey, duration: float = 1.0) -> None:
@@ -241,19 +314,19 @@ class ShellExtension(AbstractShellDevice):
     def wlan_ip(self) -> str:
         """get device wlan ip address"""
         result = self.shell(["ifconfig", "wlan0"])
-        m = re.search(r"inet\s*addr:(.*?)\s", result, re.DOTALL)
+        m = _INET_ADDR_RE.search(result)
         if m:
             return m.group(1)
 
         # Huawei P30, has no ifconfig
         result = self.shell(["ip", "addr", "show", "dev", "wlan0"])
-        m = re.search(r"inet (\d+.*?)/\d+", result)
+        m = _INET_IP_RE.search(result)
         if m:
             return m.group(1)
 
         # On VirtualDevice, might use eth0
         result = self.shell(["ifconfig", "eth0"])
-        m = re.search(r"inet\s*addr:(.*?)\s", result, re.DOTALL)
+        m = _INET_ADDR_RE.search(result)
         if m:
             return m.group(1)
 
@@ -265,7 +338,7 @@ class ShellExtension(AbstractShellDevice):
             int [0, 1, 2, 3]
         """
         for line in self.shell("dumpsys display").splitlines():
-            m = re.search(r".*?orientation=(?P<orientation>\d+)", line)
+            m = _ORIENTATION_RE.search(line)
             if not m:
                 continue
             o = int(m.group("orientation"))
@@ -285,7 +358,7 @@ class ShellExtension(AbstractShellDevice):
         return "mHoldingDisplaySuspendBlocker=true" in output
 
     def open_browser(self, url: str):
-        if not re.match("^https?://", url):
+        if not HTTP_URL_RE.match(url):
             url = "https://" + url
         self.shell(["am", "start", "-a", "android.intent.action.VIEW", "-d", url])
 
@@ -294,11 +367,9 @@ class ShellExtension(AbstractShellDevice):
         Returns:
             list of package names
         """
-        result = []
-        output = self.shell(["pm", "list", "packages"])
-        for m in re.finditer(r"^package:([^\s]+)\r?$", output, re.M):
-            result.append(m.group(1))
-        return list(sorted(result))
+        # match on raw bytes, only package names need decoding
+        output = self.shell(["pm", "list", "packages"], encoding=None)
+        return sorted(m.group(1).decode("utf-8") for m in _PACKAGE_LINE_RE.finditer(output))
 
     def uninstall(self, pkg_name: str):
         """
@@ -367,33 +438,29 @@ class ShellExtension(AbstractShellDevice):
         sub_apk_paths = list(map(lambda p: p.replace("package:", "", 1), apk_paths[1:]))
 
         output = self.shell(["dumpsys", "package", package_name])
-        m = re.compile(r"versionName=(?P<name>[^\s]+)").search(output)
-        version_name = m.group("name") if m else ""
+        fields = {}  # keep the first match of each field
+        for m in _PACKAGE_INFO_RE.finditer(output):
+            fields.setdefault(m.lastgroup, m.group(m.lastgroup))
+            if len(fields) == _PACKAGE_INFO_FIELDS:
+                break
+
+        version_name = fields.get("version_name", "")
         if version_name == "null":  # Java dumps "null" for null values
             version_name = None
-        m = re.compile(r"versionCode=(?P<code>\d+)").search(output)
-        version_code = m.group("code") if m else ""
+        version_code = fields.get("version_code", "")
         version_code = int(version_code) if version_code.isdigit() else None
-        m = re.search(r"PackageSignatures\{.*?\[(.*)\]\}", output)
-        signature = m.group(1) if m else None
+        signature = fields.get("signature")
         if not version_name and signature is None:
             return None
-        m = re.compile(r"pkgFlags=\[\s*(.*)\s*\]").search(output)
-        pkgflags = m.group(1) if m else ""
-        pkgflags = pkgflags.split()
-
-        time_regex = r"[-\d]+\s+[:\d]+"
-        m = re.compile(f"firstInstallTime=({time_regex})").search(output)
-        first_install_time = (
-            datetime.datetime.strptime(m.group(1), "%Y-%m-%d %H:%M:%S") if m else None
-        )
+        pkgflags = fields.get("pkgflags", "").split()
 
-        m = re.compile(f"lastUpdateTime=({time_regex})").search(output)
-        last_update_time = (
-            datetime.datetime.strptime(m.group(1).strip(), "%Y-%m-%d %H:%M:%S")
-            if m
-            else None
-        )
+        first_install_time = fields.get("first_install_time")
+        if first_install_time:
+            first_install_time = datetime.datetime.strptime(first_install_time, "%Y-%m-%d %H:%M:%S")
+
+        last_update_time = fields.get("last_update_time")
+        if last_update_time:
+            last_update_time = datetime.datetime.strptime(last_update_time.strip(), "%Y-%m-%d %H:%M:%S")
 
         app_info = AppInfo(
             package_name=package_name,
@@ -409,14 +476,30 @@ class ShellExtension(AbstractShellDevice):
         return app_info
 
     @retry(AdbError, delay=0.5, tries=3, jitter=0.1)
-    def app_current(self) -> RunningAppInfo:
+    def app_current(self, fast: bool = False) -> RunningAppInfo:
         """
+        Args:
+            fast: only check mCurrentFocus of dumpsys window, which is enough on Android 8+,
+                skip the dumpsys activity fallbacks
+
         Returns:
             RunningAppInfo(package, activity, pid?)  pid can be 0
 
         Raises:
             AdbError
+
+        Note:
+            set app_current_cache_ttl to reuse the result for a while, eg: in polling loops
         """
+        if self._app_current_cache and self.app_current_cache_ttl > 0:
+            cached_time, cached_app = self._app_current_cache
+            if time.monotonic() - cached_time < self.app_current_cache_ttl:
+                return cached_app
+        app = self._app_current(fast)
+        self._app_current_cache = (time.monotonic(), app)
+        return app
+
+    def _app_current(self, fast: bool) -> RunningAppInfo:
         # Related issue: https://github.com/openatx/uiautomator2/issues/200
         # $ adb shell dumpsys window windows
         # Example output:
@@ -425,44 +508,44 @@ class ShellExtension(AbstractShellDevice):
         # Regexp
         #   r'mFocusedApp=.*ActivityRecord{\w+ \w+ (?P<package>.*)/(?P<activity>.*) .*'
         #   r'mCurrentFocus=Window{\w+ \w+ (?P<package>.*)/(?P<activity>.*)\}')
-        _focusedRE = re.compile(
-            r"mCurrentFocus=Window{.*\s+(?P<package>[^\s]+)/(?P<activity>[^\s]+)\}"
-        )
-        m = _focusedRE.search(self.shell(["dumpsys", "window", "windows"]))
-        if m:
-            return RunningAppInfo(
-                package=m.group("package"), activity=m.group("activity")
-            )
-
-        # search mResumedActivity
+        # grep on the device so only the focus line is sent back, the full dump is the
+        # fallback when grep is missing (old Android) or found nothing.
+        # the output is read line by line and dropped as soon as the focused window is found
+        cmd = "dumpsys window windows | grep mCurrentFocus || dumpsys window windows"
+        for line in self._shell_lines(cmd):
+            pos = line.find("mCurrentFocus=")
+            if pos < 0:
+                continue
+            m = _FOCUSED_RE.match(line, pos + len("mCurrentFocus="))
+            if m:
+                return RunningAppInfo(
+                    package=m.group("package"), activity=m.group("activity")
+                )
+        if fast:
+            raise AdbError("Couldn't get focused app")
+
+        # search mResumedActivity, and try: adb shell dumpsys activity top
         # https://stackoverflow.com/questions/13193592/adb-android-getting-the-name-of-the-current-activity
+        # both dumps are fetched in one shell call and scanned in a single pass,
+        # mResumedActivity comes first since activities is dumped before top
         package = None
-        output = self.shell(["dumpsys", "activity", "activities"])
-        _recordRE = re.compile(
-            r"mResumedActivity: ActivityRecord\{.*?\s+(?P<package>[^\s]+)/(?P<activity>[^\s]+)\s.*?\}"
-        )  # yapf: disable
-        m = _recordRE.search(output)
-        if m:
-            package = m.group("package")
+        last = None
+        output = self.shell("dumpsys activity activities; dumpsys activity top")
+        for m in _RESUMED_OR_ACTIVITY_RE.finditer(output):
+            if m.lastgroup == "resumed":
+                if package is None:
+                    package = m.group("resumed_package")
+                continue
+            last = m
+            if m.group("package") == package:
+                break
 
-        # try: adb shell dumpsys activity top
-        _activityRE = re.compile(
-            r"ACTIVITY (?P<package>[^\s]+)/(?P<activity>[^/\s]+) \w+ pid=(?P<pid>\d+)"
-        )
-        output = self.shell(["dumpsys", "activity", "top"])
-        ms = _activityRE.finditer(output)
-        ret = None
-        for m in ms:
-            ret = RunningAppInfo(
-                package=m.group("package"),
-                activity=m.group("activity"),
-                pid=int(m.group("pid")),
+        if last:  # the resumed one, or the last result
+            return RunningAppInfo(
+                package=last.group("package"),
+                activity=last.group("activity"),
+                pid=int(last.group("pid")),
             )
-            if ret.package == package:
-                return ret
-
-        if ret:  # get last result
-            return ret
         raise AdbError("Couldn't get focused app")
 
     def dump_hierarchy(self) -> str:
@@ -481,10 +564,7 @@ class ShellExtension(AbstractShellDevice):
         if 'ERROR' in output or 'success' not in output:
             raise AdbError("uiautomator dump failed", output)
 
-        buf = b''
-        for chunk in self.sync.iter_content(target):
-            buf += chunk
-        xml_data = buf.decode("utf-8")
+        xml_data = self.sync.read_text(target)
         if not xml_data.startswith('<?xml'):
             raise AdbError("dump output is not xml", xml_data)
         return xml_data
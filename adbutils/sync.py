@@ -11,14 +11,20 @@ import datetime
 import typing
 import os
 import io
+import socket
 import stat
 import pathlib
 from contextlib import contextmanager
 
-from adbutils._adb import BaseClient, AdbError
+from adbutils._adb import AdbConnection, BaseClient, AdbError
 from adbutils._proto import FileInfo
 from adbutils._utils import append_path
-from adbutils.errors import AdbSyncError
+from adbutils.errors import AdbSyncError, AdbTimeout
+
+try:
+    import lz4.frame
+except ImportError:  # optional, enables compressed push/pull
+    lz4 = None
 
 logger = logging.getLogger(__name__)
 
@@ -28,29 +34,164 @@ _DENT = "DENT"  # Directory Entity
 _DONE = "DONE"
 _DATA = "DATA"
 
+# max payload of a single DATA packet, see SYNC_DATA_MAX in adb file_sync_protocol.h
+_SYNC_DATA_MAX = 64 * 1024
+_SYNC_SOCKET_BUFSIZE = 1024 * 1024
+_PULL_FILE_BUFSIZE = 1024 * 1024
+
+# sendrecv_v2 compression flags, see file_sync_protocol.h
+_SYNC_FLAG_LZ4 = 2
+
+# precompiled structs of the sync protocol, all fields are little endian uint32
+_U32 = struct.Struct("<I")
+_U32_PAIR = struct.Struct("<II")
+_STAT_BODY = struct.Struct("<III")  # mode, size, mtime
+_DENT_BODY = struct.Struct("<IIII")  # mode, size, mtime, namelen
+
+
+def _recv_exact(conn: socket.socket, buf: memoryview, n: int) -> int:
+    """ recv n bytes into buf, return bytes received (less than n when connection closed) """
+    received = 0
+    try:
+        while received < n:
+            nbytes = conn.recv_into(buf[received:n])
+            if not nbytes:
+                break
+            received += nbytes
+    except socket.timeout:
+        raise AdbTimeout("adb read timeout")
+    return received
+
 
 class Sync():
 
     def __init__(self, adbclient: BaseClient, serial: str):
         self._adbclient = adbclient
         self._serial = serial
+        self._in_session = False
+        self._session_busy = False
+        self._session_conn: typing.Optional[AdbConnection] = None
 
     @contextmanager
-    def _prepare_sync(self, path: str, cmd: str):
+    def session(self):
+        """
+        Reuse one sync connection for all operations inside the with block,
+        instead of opening a new connection and transport for each of them
+
+        Example:
+            with d.sync.session() as sync:
+                for name in names:
+                    sync.push(name, "/sdcard/")
+        """
+        if self._in_session:  # nested, the outer one owns the connection
+            yield self
+            return
+        self._in_session = True
+        try:
+            yield self
+        finally:
+            self._in_session = False
+            c, self._session_conn = self._session_conn, None
+            if c is not None:
+                try:
+                    c.conn.sendall(b"QUIT" + _U32.pack(0))
+                except OSError:
+                    pass
+                c.close()
+
+    def _open_sync(self) -> AdbConnection:
         c = self._adbclient.make_connection()
         try:
+            self._tune_socket(c.conn)
             c.send_command(":".join(["host", "transport", self._serial]))
             c.check_okay()
             c.send_command("sync:")
             c.check_okay()
+        except BaseException:
+            c.close()
+            raise
+        return c
+
+    @contextmanager
+    def _prepare_sync(self, path: str, cmd: str, setup: bytes = b""):
+        """
+        Args:
+            setup: extra setup message sent after path, used by v2 commands
+        """
+        # the session connection serves one request at a time, a request issued while
+        # another one is still streaming (eg: stat inside iter_directory loop) gets its own
+        shared = self._in_session and not self._session_busy
+        if not shared:
+            c = self._open_sync()
+        elif self._session_conn is None:
+            c = self._session_conn = self._open_sync()
+        else:
+            c = self._session_conn
+        if shared:
+            self._session_busy = True
+        done = False
+        try:
             # {COMMAND}{LittleEndianPathLength}{Path}
             path_len = len(path.encode('utf-8'))
-            c.conn.send(
-                cmd.encode("utf-8") + struct.pack("<I", path_len) +
-                path.encode("utf-8"))
+            c.conn.sendall(
+                cmd.encode("utf-8") + _U32.pack(path_len) +
+                path.encode("utf-8") + setup)
             yield c
+            done = True
         finally:
-            c.close()
+            if not shared:
+                c.close()
+            else:
+                self._session_busy = False
+                if not done:
+                    # response not fully read, the connection can not be reused
+                    c.close()
+                    if self._session_conn is c:
+                        self._session_conn = None
+
+    def _tune_socket(self, s: socket.socket):
+        """ disable nagle and enlarge socket buffers for bulk transfer """
+        try:
+            s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, _SYNC_SOCKET_BUFSIZE)
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, _SYNC_SOCKET_BUFSIZE)
+        except OSError as e:  # not a tcp socket
+            logger.debug("tune sync socket failed: %s", e)
+
+    def _lz4_enabled(self) -> bool:
+        """ whether push/pull can use sendrecv_v2 with lz4 compression """
+        if lz4 is None:
+            return False
+        features = self._adbclient._get_device_features(self._serial)
+        return "sendrecv_v2" in features and "sendrecv_v2_lz4" in features
+
+    def _send_data(self, c, data: bytes, packet: bytearray):
+        """ send data in DATA packets, header and payload in one packet
+
+        Args:
+            packet: reused buffer of 8 + _SYNC_DATA_MAX bytes, starts with DATA
+        """
+        view = memoryview(packet)
+        data = memoryview(data)
+        for i in range(0, len(data), _SYNC_DATA_MAX):
+            chunk = data[i:i + _SYNC_DATA_MAX]
+            n = len(chunk)
+            _U32.pack_into(packet, 4, n)
+            view[8:8 + n] = chunk
+            c.conn.sendall(view[:8 + n])
+
+    def _send_stream(self, c, r: typing.BinaryIO, packet: bytearray) -> int:
+        """ read r straight into the payload of packet and send it, return size sent """
+        view = memoryview(packet)
+        total_size = 0
+        while True:
+            n = r.readinto(view[8:])
+            if not n:
+                break
+            total_size += n
+            _U32.pack_into(packet, 4, n)
+            c.conn.sendall(view[:8 + n])
+        return total_size
 
     def exists(self, path: str) -> bool:
         finfo = self.stat(path)
@@ -59,7 +200,7 @@ class Sync():
     def stat(self, path: str) -> FileInfo:
         with self._prepare_sync(path, "STAT") as c:
             assert "STAT" == c.read_string(4)
-            mode, size, mtime = struct.unpack("<III", c.conn.recv(12))
+            mode, size, mtime = _STAT_BODY.unpack(c.read(_STAT_BODY.size))
             # when mtime is 0, windows will error
             mdtime = datetime.datetime.fromtimestamp(mtime) if mtime else None
             return FileInfo(mode, size, mdtime, path)
@@ -68,10 +209,10 @@ class Sync():
         with self._prepare_sync(path, "LIST") as c:
             while 1:
                 response = c.read_string(4)
-                if response == _DONE:
+                mode, size, mtime, namelen = _DENT_BODY.unpack(
+                    c.read(_DENT_BODY.size))
+                if response == _DONE:  # followed by an empty dent
                     break
-                mode, size, mtime, namelen = struct.unpack(
-                    "<IIII", c.conn.recv(16))
                 name = c.read_string(namelen)
                 try:
                     mtime = datetime.datetime.fromtimestamp(mtime)
@@ -126,23 +267,40 @@ class Sync():
             if not hasattr(src, "read"):
                 raise TypeError("Invalid src type: %s" % type(src))
 
-        path = dst + "," + str(stat.S_IFREG | mode)
+        compressor = None
+        if self._lz4_enabled():
+            # SND2{path_len}{path}SND2{mode}{flags}
+            setup = b"SND2" + _U32_PAIR.pack(stat.S_IFREG | mode, _SYNC_FLAG_LZ4)
+            prepare = self._prepare_sync(dst, "SND2", setup)
+            compressor = lz4.frame.LZ4FrameCompressor()
+        else:
+            prepare = self._prepare_sync(dst + "," + str(stat.S_IFREG | mode), "SEND")
+
         total_size = 0
-        with self._prepare_sync(path, "SEND") as c:
+        with prepare as c:
             r = src if hasattr(src, "read") else open(src, "rb")
             try:
-                while True:
-                    chunk = r.read(4096) # should not >64k
-                    if not chunk:
-                        mtime = int(datetime.datetime.now().timestamp())
-                        c.conn.send(b"DONE" + struct.pack("<I", mtime))
-                        break
-                    c.conn.send(b"DATA" + struct.pack("<I", len(chunk)))
-                    c.conn.send(chunk)
-                    total_size += len(chunk)
+                packet = bytearray(8 + _SYNC_DATA_MAX)
+                packet[:4] = b"DATA"
+                if not compressor and hasattr(r, "readinto"):
+                    total_size = self._send_stream(c, r, packet)
+                else:
+                    if compressor:
+                        self._send_data(c, compressor.begin(), packet)
+                    while True:
+                        chunk = r.read(_SYNC_DATA_MAX)
+                        if not chunk:
+                            break
+                        total_size += len(chunk)
+                        self._send_data(c, compressor.compress(chunk) if compressor else chunk, packet)
+                    if compressor:
+                        self._send_data(c, compressor.flush(), packet)
+                mtime = int(datetime.datetime.now().timestamp())
+                c.conn.sendall(b"DONE" + _U32.pack(mtime))
                 status_msg = c.read_string(4)
+                msg_len = c.read_uint32()
                 if status_msg != _OKAY:
-                    raise AdbError(status_msg)
+                    raise AdbError(status_msg, c.read_string(msg_len))
             finally:
                 if hasattr(r, "close"):
                     r.close()
@@ -155,21 +313,43 @@ class Sync():
         return total_size
 
     def iter_content(self, path: str) -> typing.Iterator[bytes]:
-        with self._prepare_sync(path, "RECV") as c:
+        for chunk in self._iter_content_view(path):
+            yield bytes(chunk)
+
+    def _iter_content_view(self, path: str) -> typing.Iterator[typing.Union[memoryview, bytes]]:
+        """ same as iter_content, but yield views of a reused buffer, valid until next iteration """
+        decompressor = None
+        if self._lz4_enabled():
+            # RCV2{path_len}{path}RCV2{flags}
+            prepare = self._prepare_sync(path, "RCV2", b"RCV2" + _U32.pack(_SYNC_FLAG_LZ4))
+            decompressor = lz4.frame.LZ4FrameDecompressor()
+        else:
+            prepare = self._prepare_sync(path, "RECV")
+        with prepare as c:
+            # every response is {COMMAND}{LittleEndianLength}, read them together
+            header = memoryview(bytearray(8))
+            buf = memoryview(bytearray(_SYNC_DATA_MAX))
             while True:
-                cmd = c.read_string(4)
+                if _recv_exact(c.conn, header, 8) != 8:
+                    raise AdbError("read sync header missing")
+                cmd = bytes(header[:4]).decode("utf-8", errors="replace")
+                size = _U32.unpack_from(header, 4)[0]
                 if cmd == _FAIL:
-                    str_size = struct.unpack("<I", c.read(4))[0]
-                    error_message = c.read_string(str_size)
+                    error_message = c.read_string(size)
                     raise AdbError(error_message, path)
                 elif cmd == _DONE:
                     break
                 elif cmd == _DATA:
-                    chunk_size = struct.unpack("<I", c.read(4))[0]
-                    chunk = c.read(chunk_size)
-                    if len(chunk) != chunk_size:
+                    if size > len(buf):
+                        buf = memoryview(bytearray(size))
+                    if _recv_exact(c.conn, buf, size) != size:
                         raise AdbError("read chunk missing")
-                    yield chunk
+                    if decompressor:
+                        data = decompressor.decompress(buf[:size])
+                        if data:
+                            yield data
+                    else:
+                        yield buf[:size]
                 else:
                     raise AdbError("Invalid sync cmd", cmd)
 
@@ -205,11 +385,10 @@ class Sync():
         """
         if isinstance(dst, str):
             dst = pathlib.Path(dst)
-        with dst.open("wb") as f:
+        with dst.open("wb", buffering=_PULL_FILE_BUFSIZE) as f:
             size = 0
-            for chunk in self.iter_content(src):
-                f.write(chunk)
-                size += len(chunk)
+            for chunk in self._iter_content_view(src):
+                size += f.write(chunk)
             return size
         
     def pull_dir(self, src: str, dst: typing.Union[str, pathlib.Path], exist_ok: bool = True) -> int:
@@ -8,8 +8,15 @@ import asyncio
 import functools
 import logging
 import re
+import stat
+import struct
 from typing import Union, overload
 
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
 logger = logging.getLogger(__name__)
 
 
@@ -104,6 +111,20 @@ SHELL_OUTPUTS = {
     "pwd": "/",
 }
 
+DEVICE_FEATURES = "shell_v2,cmd,stat_v2"
+if lz4 is not None:
+    DEVICE_FEATURES += ",sendrecv_v2,sendrecv_v2_lz4"
+
+@register_command(re.compile("host-serial:.*:features"))
+async def host_serial_features(ctx: Context):
+    await ctx.send(b"OKAY")
+    await ctx.send(encode_string(DEVICE_FEATURES))
+
+
+def shell_v2_packet(packet_id: int, payload: bytes) -> bytes:
+    return bytes([packet_id]) + struct.pack("<I", len(payload)) + payload
+
+
 @register_command(re.compile("host:tport:serial:.*"))
 async def host_tport_serial(ctx: Context):
     serial = ctx.command.split(":")[-1]
@@ -115,12 +136,20 @@ async def host_tport_serial(ctx: Context):
         await ctx.send(b"\x00\x00\x00\x00\x00\x00\x00\x00")
 
     cmd = await ctx.recv_string_block()
-    if not cmd.startswith("shell:"):
+    if not cmd.startswith(("shell:", "exec:", "shell,v2,raw:")):
         await ctx.send(b"FAIL")
         await ctx.send(encode("unsupported command"))
         return
     await ctx.send(b"OKAY")
     shell_cmd = cmd.split(":", 1)[1]
+    if cmd.startswith("shell,v2,raw:"):
+        if shell_cmd in SHELL_OUTPUTS:
+            await ctx.send(shell_v2_packet(1, (SHELL_OUTPUTS[shell_cmd].rstrip() + "\n").encode()))
+            await ctx.send(shell_v2_packet(3, b"\x00"))
+        else:
+            await ctx.send(shell_v2_packet(2, b"unknown command\n"))
+            await ctx.send(shell_v2_packet(3, b"\x7f"))
+        return
     if shell_cmd in SHELL_OUTPUTS:
         await ctx.send((SHELL_OUTPUTS[shell_cmd].rstrip() + "\n").encode())
     else:
@@ -128,6 +157,83 @@ async def host_tport_serial(ctx: Context):
     
 
 
+SYNC_FILES: dict[str, bytes] = {
+    "/sdcard/hello.txt": b"hello world",
+}
+SYNC_CONNECTIONS = 0
+
+
+@register_command(re.compile("host:transport:.*"))
+async def host_transport(ctx: Context):
+    await ctx.send(b"OKAY")
+    cmd = await ctx.recv_string_block()
+    if cmd != "sync:":
+        await ctx.send(b"FAIL")
+        await ctx.send(encode("unsupported command"))
+        return
+    global SYNC_CONNECTIONS
+    SYNC_CONNECTIONS += 1
+    await ctx.send(b"OKAY")
+    # one sync connection serves requests until QUIT
+    while await sync_request(ctx):
+        pass
+
+
+async def sync_request(ctx: Context) -> bool:
+    """ handle one sync request, return False when the connection should be closed """
+    header = await ctx.reader.readexactly(8)
+    sync_cmd, path_len = header[:4], struct.unpack("<I", header[4:])[0]
+    if sync_cmd == b"QUIT":
+        return False
+    path = (await ctx.reader.readexactly(path_len)).decode()
+    if sync_cmd == b"STAT":
+        data = SYNC_FILES.get(path)
+        if data is None:
+            await ctx.send(b"STAT" + struct.pack("<III", 0, 0, 0))
+        else:
+            await ctx.send(b"STAT" + struct.pack("<III", stat.S_IFREG | 0o644, len(data), 1700000000))
+    elif sync_cmd == b"RECV":
+        data = SYNC_FILES.get(path)
+        if data is None:
+            message = b"No such file or directory"
+            await ctx.send(b"FAIL" + struct.pack("<I", len(message)) + message)
+            return False
+        for i in range(0, len(data), 4096):
+            chunk = data[i:i + 4096]
+            await ctx.send(b"DATA" + struct.pack("<I", len(chunk)) + chunk)
+        await ctx.send(b"DONE" + struct.pack("<I", 0))
+    elif sync_cmd == b"RCV2":
+        await ctx.reader.readexactly(8)  # RCV2{flags}, only lz4 supported
+        data = SYNC_FILES.get(path)
+        if data is None:
+            message = b"No such file or directory"
+            await ctx.send(b"FAIL" + struct.pack("<I", len(message)) + message)
+            return False
+        compressed = lz4.frame.compress(data)
+        for i in range(0, len(compressed), 4096):
+            chunk = compressed[i:i + 4096]
+            await ctx.send(b"DATA" + struct.pack("<I", len(chunk)) + chunk)
+        await ctx.send(b"DONE" + struct.pack("<I", 0))
+    elif sync_cmd in (b"SEND", b"SND2"):
+        if sync_cmd == b"SND2":
+            await ctx.reader.readexactly(12)  # SND2{mode}{flags}, only lz4 supported
+            dst = path
+        else:
+            dst = path.rsplit(",", 1)[0]
+        content = b""
+        while True:
+            header = await ctx.reader.readexactly(8)
+            if header[:4] == b"DONE":
+                break
+            size = struct.unpack("<I", header[4:])[0]
+            content += await ctx.reader.readexactly(size)
+        if sync_cmd == b"SND2":
+            content = lz4.frame.decompress(content)
+        SYNC_FILES[dst] = content
+        await ctx.send(b"OKAY" + struct.pack("<I", 0))
+    return True
+
+
 async def handle_command(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, server: "AdbServer"):
     try:
          # Receive the command from the client
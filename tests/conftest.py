@@ -38,7 +38,12 @@ def adb_server_fixture():
     th.start()
     wait_for_port(7305)
     yield
-    adbutils.AdbClient(port=7305).server_kill()
+    try:
+        # server may be already stopping (eg: test_server_kill), do not wait forever
+        adbutils.AdbClient(port=7305, socket_timeout=1).server_kill()
+    except adbutils.AdbError:
+        pass
+    wait_for_port(7305, ready=False)
 
 
 
@@ -4,10 +4,13 @@
 """Created on Mon May 06 2024 14:41:10 by codeskyblue
 """
 
+import io
+import socket
 from unittest import mock
 import pytest
+from PIL import Image
 import adbutils
-from adbutils.errors import AdbError
+from adbutils.errors import AdbError, AdbTimeout
 
 
 def test_shell_pwd(adb: adbutils.AdbClient):
@@ -18,14 +21,19 @@ def test_shell_pwd(adb: adbutils.AdbClient):
 def test_shell_screenshot(adb: adbutils.AdbClient):
     d = adb.device(serial="123456")
     
-    def mock_shell(cmd: str, encoding='utf-8', **kwargs):
-        if encoding is None:
-            return b""
+    def mock_shell(cmd: str, **kwargs):
         if cmd == "wm size":
             return "Physical size: 1080x1920"
-        return b""
+        return ""
+
+    exec_calls = []
+
+    def mock_exec_out(cmdargs, **kwargs):
+        exec_calls.append(cmdargs)
+        return b"invalid png data"
 
     d.shell = mock_shell
+    d.exec_out = mock_exec_out
     d.rotation = lambda: 0
 
     with pytest.raises(AdbError):
@@ -36,6 +44,15 @@ def test_shell_screenshot(adb: adbutils.AdbClient):
     # assert pixel is blank
     pixel = pil_img.getpixel((0, 0))
     assert pixel[:3] == (0, 0, 0)
+    assert exec_calls[-1] == ["screencap", "-p"]
+
+    buf = io.BytesIO()
+    Image.new("RGBA", (20, 10), (255, 0, 0, 255)).save(buf, format="png")
+    d.exec_out = lambda cmdargs, **kwargs: buf.getvalue()
+    pil_img = d.screenshot(error_ok=False)
+    assert pil_img.mode == "RGB"
+    assert pil_img.size == (20, 10)
+    assert pil_img.getpixel((0, 0)) == (255, 0, 0)
 
 
 def test_window_size(adb: adbutils.AdbClient):
@@ -54,6 +71,40 @@ def test_window_size(adb: adbutils.AdbClient):
     assert wsize.height == 1920
 
 
+def test_wm_size_override(adb: adbutils.AdbClient):
+    d = adb.device(serial="123456")
+    outputs = {
+        "wm size": "Physical size: 1080x1920\nOverride size: 720x1280",
+        "dumpsys display": "mViewports=[DisplayViewport{orientation=0]",
+    }
+    d.shell = lambda cmd: outputs[cmd]
+    assert d.window_size() == (720, 1280)
+
+    outputs["wm size"] = "Physical size: 1080x1920"
+    assert d.window_size() == (1080, 1920)
+
+
+def test_window_size_cache(adb: adbutils.AdbClient):
+    d = adb.device(serial="123456")
+    outputs = {
+        "wm size": "Physical size: 1080x1920",
+        "dumpsys display": "mViewports=[DisplayViewport{orientation=0]",
+    }
+    d.shell = lambda cmd: outputs[cmd]
+
+    d.window_size_cache_ttl = 60
+    assert d.window_size() == (1080, 1920)
+    outputs["dumpsys display"] = "mViewports=[DisplayViewport{orientation=1]"
+    assert d.window_size() == (1080, 1920)
+
+    d.invalidate_window_size()
+    assert d.window_size() == (1920, 1080)
+
+    d.window_size_cache_ttl = 0
+    outputs["dumpsys display"] = "mViewports=[DisplayViewport{orientation=0]"
+    assert d.window_size() == (1080, 1920)
+
+
 def test_shell_battery(adb: adbutils.AdbClient):
     d = adb.device(serial="123456")
 
@@ -90,4 +141,215 @@ def test_shell_battery(adb: adbutils.AdbClient):
     assert bat.scale == 100
     assert bat.voltage == 5000
     assert bat.temperature == 25.0
-    assert bat.technology == "Li-ion"
\ No newline at end of file
+    assert bat.technology == "Li-ion"
+
+
+def test_exec_out_pwd(adb: adbutils.AdbClient):
+    d = adb.device(serial="123456")
+    assert d.exec_out("pwd") == b"/\n"
+
+
+def test_prop_get(adb: adbutils.AdbClient):
+    d = adb.device(serial="123456")
+    calls = []
+
+    def mock_shell(cmdargs):
+        calls.append(cmdargs)
+        if cmdargs == ["getprop"]:
+            return ("[ro.product.model]: [Pixel 5]\n[ro.product.name]: [redfin]\n[ro.empty]: []\n"
+                    "[sys.boot_completed]: [0]\n[persist.sys.locale]: [en-US]")
+        if cmdargs == ["getprop", "ro.product.model"]:
+            return "Pixel 6\n"
+        if cmdargs == ["getprop", "sys.boot_completed"]:
+            return "1\n"
+        if cmdargs == ["getprop", "persist.sys.locale"]:
+            return "zh-CN\n"
+        return ""
+
+    d.shell = mock_shell
+    assert d.prop.model == "Pixel 5"
+    assert d.prop.name == "redfin"
+    assert d.prop.get("ro.empty") == ""
+    assert calls == [["getprop"]]
+
+    assert d.prop.get("ro.not.exist") == ""
+    assert calls[-1] == ["getprop", "ro.not.exist"]
+    assert d.prop.get("ro.product.model", cache=False) == "Pixel 6"
+
+    # only ro.* props are taken from the snapshot, others are fetched then cached per name
+    assert d.prop.get("sys.boot_completed") == "1"
+    assert calls[-1] == ["getprop", "sys.boot_completed"]
+    assert d.prop.get("persist.sys.locale") == "zh-CN"
+    assert calls[-1] == ["getprop", "persist.sys.locale"]
+    count = len(calls)
+    assert d.prop.get("persist.sys.locale") == "zh-CN"
+    assert len(calls) == count
+    assert calls.count(["getprop"]) == 1
+
+
+def test_prop_get_cache_false_first(adb: adbutils.AdbClient):
+    d = adb.device(serial="123456")
+    calls = []
+
+    def mock_shell(cmdargs):
+        calls.append(cmdargs)
+        if cmdargs == ["getprop"]:
+            return "[ro.product.name]: [redfin]"
+        return "value"
+
+    d.shell = mock_shell
+    assert d.prop.get("ro.product.model", cache=False) == "value"
+    assert d.prop.name == "redfin"
+    assert ["getprop"] in calls
+
+
+def test_list_packages(adb: adbutils.AdbClient):
+    d = adb.device(serial="123456")
+    d.shell = lambda cmd, encoding: b"package:com.b\r\npackage:com.a\r\nno-package\r\npackage:android\n"
+    assert d.list_packages() == ["android", "com.a", "com.b"]
+
+
+_DUMPSYS_PACKAGE_ = """Packages:
+  Package [com.example] (b0b0b0b):
+    userId=10100
+    pkg=Package{c1c1c1c com.example}
+    versionCode=123 minSdk=21 targetSdk=33
+    versionName=1.2.3
+    flags=[ HAS_CODE ALLOW_CLEAR_USER_DATA ]
+    timeStamp=2024-01-01 10:00:00
+    firstInstallTime=2024-01-01 10:00:01
+    lastUpdateTime=2024-01-02 11:00:02
+    signatures=PackageSignatures{d2d2d2d [e3e3e3e3]}
+    pkgFlags=[ HAS_CODE ALLOW_CLEAR_USER_DATA ]
+"""
+
+
+def test_app_info(adb: adbutils.AdbClient):
+    d = adb.device(serial="123456")
+
+    def mock_shell(cmdargs):
+        if cmdargs[:2] == ["pm", "path"]:
+            return "package:/data/app/com.example/base.apk\npackage:/data/app/com.example/split.apk"
+        if cmdargs[:2] == ["dumpsys", "package"]:
+            return _DUMPSYS_PACKAGE_
+        return ""
+
+    d.shell = mock_shell
+    info = d.app_info("com.example")
+    assert info.package_name == "com.example"
+    assert info.version_name == "1.2.3"
+    assert info.version_code == 123
+    assert info.flags == ["HAS_CODE", "ALLOW_CLEAR_USER_DATA"]
+    assert info.first_install_time.day == 1
+    assert info.last_update_time.hour == 11
+    assert info.path == "/data/app/com.example/base.apk"
+    assert info.sub_apk_paths == ["/data/app/com.example/split.apk"]
+    assert info.signature == "e3e3e3e3"
+
+
+def test_app_current(adb: adbutils.AdbClient):
+    d = adb.device(serial="123456")
+    outputs = {
+        "windows": "  mCurrentFocus=Window{41b37570 u0 com.example/com.example.MainActivity}\n",
+        "activities": "",
+        "top": "",
+    }
+
+    def mock_shell(cmdargs, **kwargs):
+        if isinstance(cmdargs, str):  # commands joined with ";"
+            return "".join(outputs[cmd.split()[-1]] for cmd in cmdargs.split(";"))
+        return outputs[cmdargs[-1]]
+
+    d.shell = mock_shell
+    d._shell_lines = lambda cmd: iter(outputs["windows"].splitlines(keepends=True))
+    info = d.app_current()
+    assert info.package == "com.example"
+    assert info.activity == "com.example.MainActivity"
+    assert d.app_current(fast=True).package == "com.example"
+
+    outputs["windows"] = ""
+    outputs["activities"] = "    mResumedActivity: ActivityRecord{a1b2 u0 com.b/.Main t12}\n"
+    outputs["top"] = (
+        "  ACTIVITY com.a/.Launcher 1a2b pid=100\n"
+        "  ACTIVITY com.b/.Main 3c4d pid=200\n"
+        "  ACTIVITY com.c/.Other 5e6f pid=300\n"
+    )
+    info = d.app_current()
+    assert (info.package, info.activity, info.pid) == ("com.b", ".Main", 200)
+
+    outputs["activities"] = ""
+    info = d.app_current()
+    assert (info.package, info.pid) == ("com.c", 300)
+
+    with pytest.raises(AdbError):
+        d.app_current(fast=True)
+
+
+def test_app_current_cache(adb: adbutils.AdbClient):
+    d = adb.device(serial="123456")
+    lines = ["  mCurrentFocus=Window{41b37570 u0 com.a/.Main}\n"]
+    d._shell_lines = lambda cmdargs: iter(lines)
+
+    d.app_current_cache_ttl = 60
+    assert d.app_current().package == "com.a"
+    lines[0] = "  mCurrentFocus=Window{41b37570 u0 com.b/.Main}\n"
+    assert d.app_current().package == "com.a"
+
+    d.app_current_cache_ttl = 0
+    assert d.app_current().package == "com.b"
+
+
+def test_shell_lines(adb: adbutils.AdbClient):
+    d = adb.device(serial="123456")
+    assert [line.rstrip() for line in d._shell_lines("pwd")] == ["/"]
+
+
+def test_shell_lines_timeout(adb: adbutils.AdbClient):
+    d = adb.device(serial="123456")
+    s1, s2 = socket.socketpair()
+    with s1, s2:
+        d.shell = lambda cmdargs, stream: mock.Mock(conn=s1)  # command never outputs
+        with pytest.raises(AdbTimeout):
+            list(d._shell_lines("dumpsys window windows", timeout=0.1))
+
+
+def test_switch_airplane(adb: adbutils.AdbClient):
+    d = adb.device(serial="123456")
+    calls = []
+    d.shell = lambda cmdargs: calls.append(cmdargs)
+    d.switch_airplane(True)
+    assert calls == [
+        "settings put global airplane_mode_on 1; "
+        "am broadcast -a android.intent.action.AIRPLANE_MODE --ez state true"
+    ]
+
+
+def test_shell2_v2(adb: adbutils.AdbClient):
+    d = adb.device(serial="123456")
+    ret = d.shell2("pwd")
+    assert ret.returncode == 0
+    assert ret.output == "/\n"
+
+    ret = d.shell2(["not-exist"], rstrip=True)
+    assert ret.returncode == 127
+    assert ret.output == "unknown command"
+
+    ret = d.shell2("pwd", encoding=None)
+    assert ret.output == b"/\n"
+
+
+def test_supports(adb: adbutils.AdbClient):
+    d = adb.device(serial="123456")
+    assert d.supports("shell_v2")
+    assert not d.supports("not-exist-feature")
+
+    # cache is shared by devices of the same client
+    with mock.patch.object(adb, "make_connection", side_effect=AssertionError("should use cache")):
+        d2 = adb.device(serial="123456")
+        assert d2.supports("cmd")
+
+    # a failed query, eg: device offline, is not cached
+    d3 = adb.device(serial="654321")
+    with mock.patch.object(adb, "make_connection", side_effect=AdbError("device offline")):
+        assert not d3.supports("shell_v2")
+    assert d3.supports("shell_v2")
@@ -4,6 +4,7 @@
 """Created on Wed May 08 2024 21:45:15 by codeskyblue
 """
 
+from unittest import mock
 import adbutils
 
 
@@ -13,3 +14,11 @@ def test_forward_list(adb: adbutils.AdbClient):
     assert items[0].serial == "123456"
     assert items[0].local == "tcp:1234"
     assert items[0].remote == "tcp:4321"
+
+
+def test_forward_port_cached(adb: adbutils.AdbClient):
+    d = adb.device(serial="123456")
+    with mock.patch.object(adb, "forward_list", wraps=adb.forward_list) as forward_list:
+        assert d.forward_port(4321) == 1234
+        assert d.forward_port("tcp:4321") == 1234
+    assert forward_list.call_count == 1
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import pytest
+import adbutils
+import adb_server
+from adbutils.errors import AdbError
+
+
+@pytest.fixture(params=["v1", "v2"])
+def sync_version(request, monkeypatch):
+    if request.param == "v1":
+        monkeypatch.setattr(adb_server, "DEVICE_FEATURES", "shell_v2")
+    else:
+        pytest.importorskip("lz4")
+    return request.param
+
+
+def test_sync_stat(adb: adbutils.AdbClient):
+    info = adb.sync("123456").stat("/sdcard/hello.txt")
+    assert info.size == len(b"hello world")
+
+
+def test_sync_read_bytes(adb: adbutils.AdbClient, sync_version):
+    assert adb.sync("123456").read_bytes("/sdcard/hello.txt") == b"hello world"
+
+    with pytest.raises(AdbError):
+        adb.sync("123456").read_bytes("/sdcard/not-exist.txt")
+
+
+def test_sync_push_and_pull(adb: adbutils.AdbClient, sync_version, tmp_path):
+    content = bytes(range(256)) * 1024  # 256 KiB, more than one DATA packet
+    sync = adb.sync("123456")
+    assert sync._lz4_enabled() == (sync_version == "v2")
+    assert sync.push(content, "/sdcard/push.bin") == len(content)
+    assert sync.read_bytes("/sdcard/push.bin") == content
+
+    dst = tmp_path / "push.bin"
+    assert sync.pull("/sdcard/push.bin", dst) == len(content)
+    assert dst.read_bytes() == content
+
+
+def test_sync_session(adb: adbutils.AdbClient, sync_version):
+    sync = adb.sync("123456")
+    count = adb_server.SYNC_CONNECTIONS
+    with sync.session():
+        assert sync.push(b"session", "/sdcard/session.txt") == len(b"session")
+        assert sync.read_bytes("/sdcard/session.txt") == b"session"
+        assert sync.stat("/sdcard/session.txt").size == len(b"session")
+    assert adb_server.SYNC_CONNECTIONS == count + 1
+
+    with sync.session():
+        with pytest.raises(AdbError):
+            sync.read_bytes("/sdcard/not-exist.txt")
+        # failed request drops the connection, next one reopens
+        assert sync.read_bytes("/sdcard/hello.txt") == b"hello world"
+    assert adb_server.SYNC_CONNECTIONS == count + 3
+
+
+def test_sync_session_interleaved(adb: adbutils.AdbClient, sync_version):
+    content = bytes(range(256)) * 1024
+    sync = adb.sync("123456")
+    sync.push(content, "/sdcard/big.bin")
+    with sync.session():
+        chunks = sync.iter_content("/sdcard/big.bin")
+        first = next(chunks)
+        # session connection is busy with RECV, stat goes over its own connection
+        assert sync.stat("/sdcard/hello.txt").size == len(b"hello world")
+        assert first + b"".join(chunks) == content
+        assert sync.stat("/sdcard/big.bin").size == len(content)
@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from unittest import mock
+
+from adbutils import _utils
+
+
+def test_adb_path_cached(monkeypatch):
+    monkeypatch.delenv("ADBUTILS_ADB_PATH", raising=False)
+    _utils._find_adb_path.cache_clear()
+    try:
+        with mock.patch.object(_utils, "which", return_value="/usr/bin/adb") as which, \
+                mock.patch.object(_utils, "_is_valid_exe", return_value=True) as is_valid:
+            assert _utils.adb_path() == "/usr/bin/adb"
+            assert _utils.adb_path() == "/usr/bin/adb"
+            assert which.call_count == 1
+            assert is_valid.call_count == 1
+
+            # env var is still checked on every call
+            monkeypatch.setenv("ADBUTILS_ADB_PATH", "/opt/adb")
+            assert _utils.adb_path() == "/opt/adb"
+    finally:
+        _utils._find_adb_path.cache_clear()